@@ -2,8 +2,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import ttest_ind
+from scipy import special
 
 # IMPORTANT: set_page_config must be the first Streamlit command
 st.set_page_config(page_title="Push Notification Analysis — Fixed Dataset", layout="wide")
@@ -26,9 +25,68 @@ and run **t-tests** to test significance between PR and Social.
 # --- Load fixed CSV file ---
 DATA_FILE = "message_comparison_report-2025-11-11 (1).csv"
 
+# The label columns repeat a handful of values; counters are downcast after loading
+COUNT_COLS = [
+    'Sends (Android Push)', 'Total Opens (Android Push)', 'Direct Opens (Android Push)',
+    'Sends (iOS Push)', 'Total Opens (iOS Push)', 'Direct Opens (iOS Push)',
+]
+LABEL_COLS = ['Day', 'Entity', 'Slot', 'Variant']
+
+PLATFORM_RATE_COLS = {
+    'Android': ('Android_Direct_Open_Rate', 'Android_Total_Open_Rate'),
+    'iOS': ('iOS_Direct_Open_Rate', 'iOS_Total_Open_Rate'),
+}
+RATE_COLS = [c for cols in PLATFORM_RATE_COLS.values() for c in cols]
+METRIC_COLS = ['DOR', 'TOR']
+# (opens, sends) counter pair behind each rate column, in RATE_COLS order
+RATE_SOURCES = [
+    ('Direct Opens (Android Push)', 'Sends (Android Push)'),
+    ('Total Opens (Android Push)', 'Sends (Android Push)'),
+    ('Direct Opens (iOS Push)', 'Sends (iOS Push)'),
+    ('Total Opens (iOS Push)', 'Sends (iOS Push)'),
+]
+
+@st.cache_data(show_spinner=False)
+def load_data(path):
+    """Read the CSV and return open rates in long form (one row per message and platform).
+
+    Also returns the Day/Entity/Slot options for the sidebar filters. Cached across reruns.
+    """
+    df = pd.read_csv(path, engine="pyarrow")
+
+    # --- Preprocessing ---
+    # Categoricals are applied after stripping so stray header whitespace doesn't skip them
+    df.columns = df.columns.str.strip()
+    df[LABEL_COLS] = df[LABEL_COLS].astype('category')
+    df['Variant'] = df['Variant'].cat.rename_categories({'VAR1': 'PR', 'VAR2': 'Social'})
+    # Shrink counters to the narrowest unsigned int that holds them (uint16/uint32 for this file)
+    df[COUNT_COLS] = df[COUNT_COLS].apply(pd.to_numeric, downcast='unsigned')
+
+    # --- Compute Open Rates (guard divide-by-zero just in case) ---
+    # All four rates in one float32 division; zero sends are left as NaN. Rates are
+    # in [0, 1] from integer counts, so float32 is plenty and halves what the groupby reads.
+    opens = df[[o for o, _ in RATE_SOURCES]].to_numpy()
+    sends = df[[s for _, s in RATE_SOURCES]].to_numpy()
+    rates = np.full(opens.shape, np.nan, dtype='float32')
+    np.divide(opens, sends, out=rates, where=sends != 0, dtype='float32')
+    df[RATE_COLS] = rates
+
+    # --- Long format: Android and iOS share the same DOR/TOR columns ---
+    long_df = pd.concat(
+        [
+            df[LABEL_COLS].assign(Platform=platform, DOR=df[dor_col], TOR=df[tor_col])
+            for platform, (dor_col, tor_col) in PLATFORM_RATE_COLS.items()
+        ],
+        ignore_index=True
+    )
+    long_df['Platform'] = long_df['Platform'].astype('category')
+
+    # Filter options straight from the categories rather than scanning with unique()
+    days, entities, slots = (df[c].cat.categories.tolist() for c in ['Day', 'Entity', 'Slot'])
+    return long_df, days, entities, slots
+
 try:
-    # read with python engine to allow flexible separators if any
-    df = pd.read_csv(DATA_FILE, sep=None, engine="python")
+    df, days, entities, slots = load_data(DATA_FILE)
 except FileNotFoundError:
     st.error(f"❌ Could not find `{DATA_FILE}`. Please place it in the same folder as this app.")
     st.stop()
@@ -36,38 +94,105 @@ except Exception as e:
     st.error(f"Error reading `{DATA_FILE}`: {e}")
     st.stop()
 
-# --- Preprocessing ---
-df.columns = df.columns.str.strip()
-df['Variant'] = df['Variant'].replace({'VAR1': 'PR', 'VAR2': 'Social'})
-
-# --- Compute Open Rates (guard divide-by-zero just in case) ---
-df['Android_Direct_Open_Rate'] = df['Direct Opens (Android Push)'] / df['Sends (Android Push)'].replace(0, np.nan)
-df['Android_Total_Open_Rate'] = df['Total Opens (Android Push)'] / df['Sends (Android Push)'].replace(0, np.nan)
-df['iOS_Direct_Open_Rate'] = df['Direct Opens (iOS Push)'] / df['Sends (iOS Push)'].replace(0, np.nan)
-df['iOS_Total_Open_Rate'] = df['Total Opens (iOS Push)'] / df['Sends (iOS Push)'].replace(0, np.nan)
+def welch_pvalues(agg):
+    """Two-sided Welch's t-test p-values (PR vs Social) for every group and metric.
+
+    `agg` holds per-group mean/var/count with (metric, stat, Variant) columns; the
+    result is a (groups x METRIC_COLS) array aligned with its rows. The
+    t statistic and Welch-Satterthwaite dof are plain array arithmetic, and the
+    p-values come from one `stdtr` call. Groups with fewer than two observations on
+    either side come out as NaN, same as `ttest_ind`.
+    """
+    def side(stat, variant):
+        return agg.xs((stat, variant), axis=1, level=[1, 2])[METRIC_COLS].to_numpy()
+
+    m1, v1, n1 = side('mean', 'PR'), side('var', 'PR'), side('count', 'PR')
+    m2, v2, n2 = side('mean', 'Social'), side('var', 'Social'), side('count', 'Social')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se1, se2 = v1 / n1, v2 / n2
+        t = (m1 - m2) / np.sqrt(se1 + se2)
+        dof = (se1 + se2) ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+    # Zero variance on both sides gives dof = 0/0; SciPy falls back to 1 there
+    dof = np.where(np.isnan(dof), 1, dof)
+    pvalue = 2 * special.stdtr(dof, -np.abs(t))
+    pvalue[(n1 < 2) | (n2 < 2)] = np.nan
+    return pvalue
+
+@st.cache_data(show_spinner=False)
+def compare_variants(_filtered_df, filter_key, group_cols):
+    """PR vs Social comparison table for each group and platform.
+
+    Cached on `filter_key` (data file + sorted filter selections) and the grouping
+    columns; the filtered frame itself is not hashed.
+    """
+    # Only compare groups that have at least one PR and one Social row; dead groups are
+    # dropped up front so they never reach the aggregation. Other Variant labels are set
+    # aside first so nunique == 2 means exactly PR and Social.
+    keys = list(group_cols) + ['Platform']
+    pr_social_df = _filtered_df[_filtered_df['Variant'].isin(['PR', 'Social'])]
+    both_variants = pr_social_df.groupby(keys, observed=True)['Variant'].transform('nunique') == 2
+    compared_df = pr_social_df[both_variants]
+
+    if compared_df.empty:
+        return pd.DataFrame()
+
+    # One groupby over (group, Platform, Variant) gives mean/var/count for both metrics at once.
+    # The reductions run over the float32 rate columns; the small per-group result is widened
+    # to float64 for the t-test, winner and margin arithmetic.
+    grouped = compared_df.groupby(keys + ['Variant'], observed=True)
+    agg = grouped[METRIC_COLS].agg(['mean', 'var', 'count']).unstack('Variant').astype('float64')
+
+    # Every output column is a plain array over the groups; the frame is built once at the end
+    dor_pvalue, tor_pvalue = welch_pvalues(agg).T
+    pr_dor = agg[('DOR', 'mean', 'PR')].to_numpy()
+    social_dor = agg[('DOR', 'mean', 'Social')].to_numpy()
+
+    # Winner and margin
+    winner = np.select(
+        [pr_dor > social_dor, pr_dor < social_dor, pr_dor == social_dor],
+        ['PR', 'Social', 'Tie'],
+        default='N/A'
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(social_dor != 0, (pr_dor - social_dor) / social_dor * 100, np.nan)
+
+    return pd.DataFrame({
+        'PR_DOR': pr_dor,
+        'Social_DOR': social_dor,
+        'PR_TOR': agg[('TOR', 'mean', 'PR')].to_numpy(),
+        'Social_TOR': agg[('TOR', 'mean', 'Social')].to_numpy(),
+        'DOR_pvalue': dor_pvalue,
+        'TOR_pvalue': tor_pvalue,
+        'DOR_Significant': dor_pvalue < 0.05,
+        'TOR_Significant': tor_pvalue < 0.05,
+        'Winner_Variant': winner,
+        'Margin_of_Victory (%)': margin
+    }, index=agg.index).reset_index()
 
 # --- Sidebar Filters ---
 st.sidebar.header("🔎 Filter Data")
-day_filter = st.sidebar.multiselect("Select Day(s)", df['Day'].unique(), default=list(df['Day'].unique()))
-entity_filter = st.sidebar.multiselect("Select Entity (Cohort)", df['Entity'].unique(), default=list(df['Entity'].unique()))
-slot_filter = st.sidebar.multiselect("Select Slot(s)", df['Slot'].unique(), default=list(df['Slot'].unique()))
+day_filter = st.sidebar.multiselect("Select Day(s)", days, default=days)
+entity_filter = st.sidebar.multiselect("Select Entity (Cohort)", entities, default=entities)
+slot_filter = st.sidebar.multiselect("Select Slot(s)", slots, default=slots)
 platform_filter = st.sidebar.multiselect("Select Platform(s)", ['Android', 'iOS'], default=['Android', 'iOS'])
 
-filtered_df = df[df['Day'].isin(day_filter) & df['Entity'].isin(entity_filter) & df['Slot'].isin(slot_filter)]
+# Day/Entity/Slot/Platform are categoricals, so isin compares category codes rather than strings
+filtered_df = df[np.logical_and.reduce([
+    df['Day'].isin(day_filter),
+    df['Entity'].isin(entity_filter),
+    df['Slot'].isin(slot_filter),
+    df['Platform'].isin(platform_filter),
+])]
 
 # --- Overview Metrics ---
 st.subheader("📈 Overall Performance Summary")
-def summarize(platform):
-    if platform == 'Android':
-        dor = filtered_df['Android_Direct_Open_Rate'].mean(skipna=True)
-        tor = filtered_df['Android_Total_Open_Rate'].mean(skipna=True)
-    else:
-        dor = filtered_df['iOS_Direct_Open_Rate'].mean(skipna=True)
-        tor = filtered_df['iOS_Total_Open_Rate'].mean(skipna=True)
-    return dor, tor
+platform_means = (
+    filtered_df.groupby('Platform', observed=True)[METRIC_COLS].mean()
+    .reindex(platform_filter)
+)
 
 for platform in platform_filter:
-    dor, tor = summarize(platform)
+    dor, tor = platform_means.loc[platform]
     col1, col2 = st.columns(2)
     with col1:
         st.metric(f"{platform} Direct Open Rate", f"{(dor or 0)*100:.2f}%")
@@ -84,59 +209,12 @@ group_cols = st.multiselect(
 )
 
 if group_cols:
-    results = []
-    # Make sure groupby keys are consistent tuples for zip
-    for group_vals, group_df in filtered_df.groupby(group_cols):
-        # ensure group_vals is a tuple
-        if not isinstance(group_vals, tuple):
-            group_vals = (group_vals,)
-
-        for platform in platform_filter:
-            if platform == 'Android':
-                dor_col, tor_col = 'Android_Direct_Open_Rate', 'Android_Total_Open_Rate'
-            else:
-                dor_col, tor_col = 'iOS_Direct_Open_Rate', 'iOS_Total_Open_Rate'
-
-            pr = group_df[group_df['Variant'] == 'PR']
-            social = group_df[group_df['Variant'] == 'Social']
-
-            if len(pr) > 0 and len(social) > 0:
-                dor_ttest = ttest_ind(pr[dor_col].dropna(), social[dor_col].dropna(), equal_var=False, nan_policy='omit')
-                tor_ttest = ttest_ind(pr[tor_col].dropna(), social[tor_col].dropna(), equal_var=False, nan_policy='omit')
-
-                pr_dor = pr[dor_col].mean()
-                social_dor = social[dor_col].mean()
-
-                # Winner and margin
-                if pd.isna(pr_dor) or pd.isna(social_dor):
-                    winner = 'N/A'
-                    margin = np.nan
-                else:
-                    if pr_dor > social_dor:
-                        winner = 'PR'
-                    elif pr_dor < social_dor:
-                        winner = 'Social'
-                    else:
-                        winner = 'Tie'
-                    margin = ((pr_dor - social_dor) / social_dor) * 100 if social_dor != 0 else np.nan
-
-                entry = {col: val for col, val in zip(group_cols, group_vals)}
-                entry.update({
-                    'Platform': platform,
-                    'PR_DOR': pr_dor,
-                    'Social_DOR': social_dor,
-                    'PR_TOR': pr[tor_col].mean(),
-                    'Social_TOR': social[tor_col].mean(),
-                    'DOR_pvalue': dor_ttest.pvalue,
-                    'TOR_pvalue': tor_ttest.pvalue,
-                    'DOR_Significant': '✅' if dor_ttest.pvalue < 0.05 else '❌',
-                    'TOR_Significant': '✅' if tor_ttest.pvalue < 0.05 else '❌',
-                    'Winner_Variant': winner,
-                    'Margin_of_Victory (%)': margin
-                })
-                results.append(entry)
-
-    result_df = pd.DataFrame(results)
+    filter_key = (
+        DATA_FILE,
+        tuple(sorted(day_filter)), tuple(sorted(entity_filter)),
+        tuple(sorted(slot_filter)), tuple(sorted(platform_filter)),
+    )
+    result_df = compare_variants(filtered_df, filter_key, tuple(group_cols))
 
     if not result_df.empty:
         st.dataframe(
@@ -144,7 +222,10 @@ if group_cols:
                 'PR_DOR': '{:.2%}', 'Social_DOR': '{:.2%}',
                 'PR_TOR': '{:.2%}', 'Social_TOR': '{:.2%}',
                 'DOR_pvalue': '{:.4f}', 'TOR_pvalue': '{:.4f}',
-                'Margin_of_Victory (%)': '{:.2f}'
+                'Margin_of_Victory (%)': '{:.2f}',
+                # Significance is stored as bool; the emoji is only applied when rendering
+                'DOR_Significant': lambda b: '✅' if b else '❌',
+                'TOR_Significant': lambda b: '✅' if b else '❌'
             }),
             use_container_width=True
         )
@@ -153,17 +234,17 @@ if group_cols:
 
         # Plot significant differences
         st.subheader("📊 Significant DOR Differences (PR - Social)")
-        sig_df = result_df[result_df['DOR_Significant'] == '✅']
+        sig_df = result_df[result_df['DOR_Significant']]
         if not sig_df.empty:
-            plt.figure(figsize=(10, 4))
-            xlabels = sig_df.apply(lambda r: f"{r['Platform']} {', '.join(str(r[c]) for c in group_cols)}", axis=1)
+            xlabels = sig_df['Platform'].astype(str) + ' ' + sig_df[group_cols[0]].astype(str)
+            for c in group_cols[1:]:
+                xlabels += ', ' + sig_df[c].astype(str)
             diffs = sig_df['PR_DOR'] - sig_df['Social_DOR']
-            plt.bar(xlabels, diffs)
-            plt.title("Significant PR - Social DOR Differences")
-            plt.ylabel("DOR Difference (Absolute)")
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            st.pyplot(plt)
+            # Native chart: only the data goes to the browser, no server-side figure rendering
+            st.bar_chart(
+                pd.DataFrame({'DOR Difference (Absolute)': diffs.to_numpy()}, index=xlabels),
+                y_label="DOR Difference (Absolute)"
+            )
         else:
             st.info("No statistically significant DOR differences found.")
     else: